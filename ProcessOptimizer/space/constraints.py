@@ -1,7 +1,32 @@
+from bisect import bisect_right
+import copy
+from joblib import Parallel, delayed, effective_n_jobs
 from sklearn.utils import check_random_state
-from .space import Real, Integer, Categorical, Space
+from .space import Dimension, Real, Integer, Categorical, Space
 import numpy as np
 
+try:
+    from numba import njit, prange
+except ImportError:
+    # Numba is optional. Without it constraints are validated with numpy.
+    njit = None
+    prange = range
+
+
+# Type tags of the constraint classes, stored as the KIND class attribute
+SINGLE, INCLUSIVE, EXCLUSIVE, SUM, CONDITIONAL = range(5)
+
+# The number of candidates that Constraints.rvs() must expect to check before
+# it samples in parallel. Checking them takes around a second in one process,
+# which is about the time it takes to start the processes and compile the
+# numba validation in each of them.
+_PARALLEL_MIN_CANDIDATES = 10 ** 7
+
+# The number of samples that Constraints must validate at once before they use
+# the numba validation. Compiling it takes a few seconds the first time, and
+# smaller batches are validated about as fast with numpy.
+_NUMBA_MIN_SAMPLES = 5000
+
 
 class Constraints:
     def __init__(self, constraints_list, space):
@@ -29,30 +54,190 @@ class Constraints:
         self.conditional = []
         # A copy of the list of constraints:
         self.constraints_list = constraints_list
-        # Append constraints to the lists
+        self._hash = hash(tuple(constraints_list))
+        # Append constraints to the lists. The lists are indexed by the KIND
+        # of the constraint.
+        buckets = (self.single, self.inclusive, self.exclusive, self.sum,
+                   self.conditional)
         for constraint in constraints_list:
-            if isinstance(constraint, Single):
+            kind = getattr(constraint, 'KIND', None)
+            if kind == SINGLE:
                 self.single[constraint.dimension] = constraint
-            elif isinstance(constraint, Inclusive):
-                self.inclusive[constraint.dimension].append(constraint)
-            elif isinstance(constraint, Exclusive):
-                self.exclusive[constraint.dimension].append(constraint)
-            elif isinstance(constraint, Sum):
-                self.sum.append(constraint)
-            elif isinstance(constraint, Conditional):
-                self.conditional.append(constraint)
+            elif kind == INCLUSIVE or kind == EXCLUSIVE:
+                buckets[kind][constraint.dimension].append(constraint)
+            elif kind == SUM or kind == CONDITIONAL:
+                buckets[kind].append(constraint)
             else:
                 raise TypeError(
                     'Constraint type {} is not recognized'.format(
                         type(constraint)))
+        # The dimensions that have Single, Inclusive or Exclusive constraints.
+        # The other dimensions are skipped when validating samples.
+        self._active_dims = [
+            dim for dim in range(space.n_dims)
+            if self.single[dim] or self.inclusive[dim] or self.exclusive[dim]]
+        self._candidate_dtype = float if space.is_real else object
+        self._build_samplers()
+        self._build_validator()
+        self._compile_validate_sample()
+
+    def _build_samplers(self):
+        """Groups the dimensions without a Single constraint by type, so each
+        group can be sampled with a single call to the random state"""
+        real_idx, real_low, real_high, real_log = [], [], [], []
+        real_min, real_max = [], []
+        int_idx, int_low, int_high = [], [], []
+        self._cat_idx, self._cat_priors = [], []
+        # (index, sampler, inverse_transform) for the remaining dimensions
+        self._other_samplers = []
+        # Categorical values are sampled and validated as integer codes, i.e.
+        # their index in the categories of the dimension. They are only
+        # translated back to the categories for the valid samples.
+        self._categories = [None] * self.space.n_dims
+        self._cat_codes = [None] * self.space.n_dims
+        self._cat_shared = [None] * self.space.n_dims
+        # The value that dimensions with a Single constraint are filled with
+        self._single_fill = [None] * self.space.n_dims
+        for i, dim in enumerate(self.space.dimensions):
+            if isinstance(dim, Categorical):
+                self._categories[i] = _object_array(dim.categories)
+                self._cat_codes[i] = {
+                    category: code
+                    for code, category in enumerate(dim.categories)}
+                if len(self._cat_codes[i]) < len(dim.categories):
+                    # Categories that are equal, e.g. 1 and True, share the
+                    # code of the last of them, as constraints compare values
+                    # by equality. Sampled codes are mapped to the shared code
+                    # before they are validated.
+                    self._cat_shared[i] = np.array(
+                        [self._cat_codes[i][category]
+                         for category in dim.categories])
+            if self.single[i]:
+                value = self.single[i].value
+                if isinstance(dim, Categorical):
+                    # Fill with the code of the category that has the type of
+                    # the value, so e.g. True is not returned as 1
+                    value = next(
+                        (code for code, category in enumerate(dim.categories)
+                         if type(category) is type(value)
+                         and category == value),
+                        self._cat_codes[i][value])
+                self._single_fill[i] = value
+                continue
+            if isinstance(dim, Real):
+                real_idx.append(i)
+                real_min.append(dim.low)
+                real_max.append(dim.high)
+                real_log.append(dim.prior == 'log-uniform')
+                if dim.prior == 'log-uniform':
+                    real_low.append(np.log10(dim.low))
+                    real_high.append(np.log10(dim.high))
+                else:
+                    real_low.append(dim.low)
+                    real_high.append(dim.high)
+            elif isinstance(dim, Integer) and _is_uniform_integer(dim):
+                int_idx.append(i)
+                int_low.append(dim.low)
+                int_high.append(dim.high)
+            elif isinstance(dim, Categorical):
+                self._cat_idx.append(i)
+                self._cat_priors.append(np.asarray(dim.prior_, dtype=float))
+            elif type(dim).rvs is Dimension.rvs:
+                # Anything else is sampled with the distribution of the
+                # dimension. We sample directly from it, as rng is already a
+                # RandomState and does not need to be checked again in
+                # Dimension.rvs()
+                self._other_samplers.append(
+                    (i, dim._rvs.rvs, dim.inverse_transform))
+            else:
+                # Dimensions with their own rvs() are sampled with it
+                self._other_samplers.append((i, dim.rvs, None))
+        real_high = np.asarray(real_high, dtype=float)
+        self._real_sampling = (
+            np.asarray(real_low, dtype=float),
+            # Make the upper bound inclusive like in Real.rvs()
+            np.nextafter(real_high, real_high + 1.),
+            np.asarray(real_log, dtype=bool),
+            real_idx,
+        )
+        self._real_bounds = (
+            np.asarray(real_min, dtype=float),
+            np.asarray(real_max, dtype=float),
+        )
+        self._int_sampling = (
+            np.asarray(int_low, dtype=np.int64),
+            np.asarray(int_high, dtype=np.int64),
+            int_idx,
+        )
+
+    def _build_validator(self):
+        """Precomputes the constraint data used by `validate_samples`"""
+        n_dims = self.space.n_dims
+        # Large batches of samples are validated with a compiled function
+        # when Numba is installed. It is compiled the first time it is needed.
+        self._use_numba = njit is not None and len(self._active_dims) > 0
+        self._numba_arrays = None
+        self._single_val = [None] * n_dims
+        self._incl_lo = [None] * n_dims
+        self._incl_hi = [None] * n_dims
+        self._excl_lo = [None] * n_dims
+        self._excl_hi = [None] * n_dims
+        self._incl_cats = [None] * n_dims
+        self._excl_cats = [None] * n_dims
+        self._excl_intervals = [None] * n_dims
+        for dim in range(n_dims):
+            codes = self._cat_codes[dim]
+            if self.single[dim]:
+                if codes is None:
+                    self._single_val[dim] = self.single[dim].value
+                else:
+                    self._single_val[dim] = codes[self.single[dim].value]
+            if codes is not None:
+                # A value is included if it is in any of the inclusive
+                # constraints, and excluded if it is in any of the exclusive.
+                # The categories are stored as sorted arrays of their codes.
+                if self.inclusive[dim]:
+                    self._incl_cats[dim] = np.array(sorted(frozenset(
+                        map(codes.get, frozenset().union(
+                            *[constraint._bounds_set
+                              for constraint in self.inclusive[dim]])))))
+                if self.exclusive[dim]:
+                    self._excl_cats[dim] = np.array(sorted(frozenset(
+                        map(codes.get, frozenset().union(
+                            *[constraint._bounds_set
+                              for constraint in self.exclusive[dim]])))))
+            else:
+                # Bounds are stored as arrays of shape (n_constraints, 1) so
+                # they broadcast against a column of samples.
+                if self.inclusive[dim]:
+                    bounds = np.array(
+                        [constraint.bounds for constraint in self.inclusive[dim]])
+                    self._incl_lo[dim] = bounds[:, 0:1]
+                    self._incl_hi[dim] = bounds[:, 1:2]
+                if self.exclusive[dim]:
+                    # Overlapping exclusive bounds are merged, and the
+                    # intervals are sorted so they can be binary searched.
+                    self._excl_intervals[dim] = _merge_intervals(
+                        [constraint.bounds
+                         for constraint in self.exclusive[dim]])
+                    bounds = np.array(self._excl_intervals[dim])
+                    self._excl_lo[dim] = bounds[:, 0:1]
+                    self._excl_hi[dim] = bounds[:, 1:2]
 
     def __eq__(self, other):
         if isinstance(other, Constraints):
+            # Constraints with different hashes can not be equal, so we only
+            # compare the lists if the hashes are the same
+            if self._hash != other._hash:
+                return False
             return self.constraints_list == other.constraints_list
         else:
             return False
 
-    def rvs(self, n_samples=1, random_state=None):
+    def __hash__(self):
+        return self._hash
+
+    def rvs(self, n_samples=1, random_state=None, n_jobs=1):
         """Draw random samples that all are valid with regards to the constraints.
 
         The samples are in the original space. They need to be transformed
@@ -67,6 +252,14 @@ class Constraints:
             Set random state to something other than None for reproducible
             results.
 
+        * `n_jobs` [int, default=1]:
+            Number of processes to draw samples in parallel. If `n_jobs=-1`,
+            then number of jobs is set to number of cores. The samples are
+            only drawn in parallel when the estimated number of candidates
+            needed is large, i.e. for many samples or constraints that few
+            candidates satisfy. Otherwise the samples are the same as for
+            `n_jobs=1`.
+
         Returns
         -------
         * `points`: [list of lists, shape=(n_points, n_dims)]
@@ -74,43 +267,65 @@ class Constraints:
         """
 
         rng = check_random_state(random_state)
+        n_jobs = effective_n_jobs(n_jobs)
+        if n_jobs == 1:
+            return self._rvs(n_samples, rng)
+        # Estimate the acceptance rate from a small batch drawn from a copy of
+        # rng, so the samples are the same as for n_jobs=1 when we do not
+        # sample in parallel.
+        n_pilot = 1000
+        columns = self._sample_columns(n_pilot, copy.deepcopy(rng))
+        mask = self._validate_coded(self._share_codes(columns))
+        columns = self._decode_columns(columns, np.flatnonzero(mask))
+        n_valid = np.count_nonzero(self._validate_conditional(
+            columns, np.ones(len(columns[0]), dtype=bool)))
+        if n_samples * n_pilot < _PARALLEL_MIN_CANDIDATES * max(n_valid, 1):
+            return self._rvs(n_samples, rng)
+
+        # Each process gets its own random state spawned from a seed drawn
+        # from rng, so the samples are reproducible for a given random_state
+        # and n_jobs. Joblib limits the number of threads numba uses in each
+        # process, so the processes do not oversubscribe the cores.
+        seed = np.random.SeedSequence(rng.randint(np.iinfo(np.int32).max))
+        rngs = [np.random.RandomState(np.random.MT19937(child))
+                for child in seed.spawn(n_jobs)]
+        sizes = [len(part) for part in np.array_split(range(n_samples), n_jobs)]
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(self._rvs)(size, child_rng)
+            for size, child_rng in zip(sizes, rngs))
+        return [row for rows in results for row in rows]
+
+    def _rvs(self, n_samples, rng):
+        """Draws n_samples valid samples using the RandomState rng"""
         # A list of the samples drawn:
         rows = []
         # Number of candidates for samples that have been checked:
         n_samples_candidates = 0
+        # Number of candidates to draw in the next batch:
+        n_batch = n_samples
 
         # We keep sampling until all samples a valid with regard to the
         # constraints:
         while len(rows) < n_samples:
-            columns = []
-            # Iterate through all dimensions:
-            for i in range(self.space.n_dims):
-                dim = self.space.dimensions[i]
-                # If a dimension has a "Single"-type constraint we just sample
-                # that value:
-                if self.single[i]:
-                    column = np.full(n_samples, self.single[i].value)
-                else:  # Using the default rvs() for the given dimension
-                    try:
-                        column = (dim.rvs(n_samples=n_samples, 
-                                          random_state=rng))
-                    except Exception as error:
-                        print(f'''Caught an error while making random points in
-                         constrained space, error is: {error}''')
-                columns.append(column)
-
-            # Transpose
-            for i in range(n_samples):
-                r = []
-                for j in range(self.space.n_dims):
-                    r.append(columns[j][i])
-                # For each individual sample we check that it is valid:
-                if self.validate_sample(r):
-                    # We only append if it is valid
-                    rows.append(r)
-
-            n_samples_candidates += n_samples
-            if n_samples_candidates > 100000 and len(rows) < 100:
+            columns = self._sample_columns(n_batch, rng)
+
+            # Validate all candidates at once and translate the valid ones
+            # back from categorical codes:
+            mask = self._validate_coded(self._share_codes(columns))
+            columns = self._decode_columns(columns, np.flatnonzero(mask))
+            mask = self._validate_conditional(
+                columns, np.ones(len(columns[0]), dtype=bool))
+            # Stack the columns into an array of samples. Spaces with integer
+            # or categorical dimensions use an object array so that values
+            # keep their type.
+            candidates = np.column_stack(
+                [np.asarray(column, dtype=self._candidate_dtype)
+                 for column in columns])
+            rows.extend(candidates[mask].tolist())
+
+            n_samples_candidates += n_batch
+            if (n_samples_candidates > max(100000, 50 * n_samples)
+                    and len(rows) < 1e-4 * n_samples_candidates):
                 # If we have less than a 1/10.000 succes rate on the sampling
                 # we throw an error
                 raise RuntimeError(
@@ -118,75 +333,319 @@ class Constraints:
                     Please check that the constraints allows for valid samples
                     to be drawn''')
 
+            if rows:
+                # The size of the next batch is chosen from the acceptance
+                # rate so far, so we expect to get the missing samples in one
+                # batch. The batches are capped so a batch fits in memory.
+                acceptance = len(rows) / n_samples_candidates
+                n_batch = int(np.ceil((n_samples - len(rows)) / acceptance))
+                n_batch = min(max(n_batch, n_samples), 64 * n_samples)
+            else:
+                # Without any valid samples we can not estimate the
+                # acceptance rate, so we double the batch instead
+                n_batch *= 2
+
         # We draw more samples when needed so we only return n_samples of the
         # samples
         return rows[:n_samples]
 
-    def validate_sample(self, sample):
-        """ Validates a sample of parameter values in regards to the
-        constraints.
+    def _sample_columns(self, n_samples, rng):
+        """Draws n_samples values for each dimension and returns them as a
+        list of arrays, one per dimension"""
+        columns = [None] * self.space.n_dims
+        # If a dimension has a "Single"-type constraint we just sample that
+        # value:
+        for i, constraint in enumerate(self.single):
+            if constraint:
+                columns[i] = np.full(n_samples, self._single_fill[i])
+
+        # All real dimensions are drawn at once. Log-uniform dimensions are
+        # drawn in log10-space and transformed back.
+        low, high, log, idx = self._real_sampling
+        if idx:
+            values = rng.uniform(low, high, size=(n_samples, len(idx)))
+            values[:, log] = 10 ** values[:, log]
+            values = np.clip(values, self._real_bounds[0], self._real_bounds[1])
+            for j, i in enumerate(idx):
+                columns[i] = values[:, j]
+
+        low, high, idx = self._int_sampling
+        if idx:
+            values = rng.randint(
+                low, high + 1, size=(n_samples, len(idx)), dtype=np.int64)
+            for j, i in enumerate(idx):
+                columns[i] = values[:, j]
+
+        # Categorical dimensions are sampled as codes
+        for i, prior in zip(self._cat_idx, self._cat_priors):
+            columns[i] = rng.choice(len(prior), size=n_samples, p=prior)
+
+        for i, sampler, inverse_transform in self._other_samplers:
+            if inverse_transform is not None:
+                columns[i] = inverse_transform(
+                    sampler(size=n_samples, random_state=rng))
+            else:
+                columns[i] = sampler(n_samples=n_samples, random_state=rng)
+        return columns
+
+    def _share_codes(self, columns):
+        """Returns the sampled columns with the codes of equal categories
+        replaced by their shared code"""
+        return [column if shared is None else shared[column]
+                for column, shared in zip(columns, self._cat_shared)]
+
+    def _decode_columns(self, columns, idx):
+        """Returns the samples with indices idx, with categorical codes
+        translated back to the categories"""
+        decoded = []
+        for categories, column in zip(self._categories, columns):
+            column = np.asarray(column)[idx]
+            if categories is not None:
+                column = categories[column]
+            decoded.append(column)
+        return decoded
+
+    def validate_samples(self, columns):
+        """ Validates many samples of parameter values at once in regards to
+        the constraints.
 
         Parameters
         ----------
-        * `sample` [list]:
-            A list of values for each dimension.
+        * `columns` [list of arrays]:
+            A list with an array of sample values for each dimension. All
+            arrays must have the same length, n_samples.
 
         Returns
         -------
-        * `is_valid`: [bool]
-           Returns True for valid samples and False for non-valid samples
+        * `is_valid`: [np.ndarray of bools, shape=(n_samples,)]
+           True for valid samples and False for non-valid samples
         """
+        # Translate the categories of constrained dimensions to codes.
+        # Values that are not in the categories get the code -1.
+        coded = list(columns)
+        for dim in self._active_dims:
+            codes = self._cat_codes[dim]
+            if codes is not None:
+                coded[dim] = np.fromiter(
+                    (codes.get(value, -1) for value in columns[dim]),
+                    dtype=np.int64, count=len(columns[dim]))
+        mask = self._validate_coded(coded)
+        return self._validate_conditional(columns, mask)
+
+    def _validate_coded(self, columns):
+        """Returns a mask of the samples that satisfy all but the Conditional
+        constraints. Categorical values must be given as codes."""
+        if (self._use_numba
+                and len(columns[self._active_dims[0]]) >= _NUMBA_MIN_SAMPLES):
+            if self._numba_arrays is None:
+                self._compile_validator()
+            mask = _validate_batch_jit(
+                np.column_stack(
+                    [columns[dim] for dim in self._active_dims]).astype(float),
+                *self._numba_arrays)
+        else:
+            mask = self._validate_dimensions(columns)
 
-        # We iterate through all the dimensions and check the the type of
-        # constriants that are applied to a single dimensions, i.e Single,
-        # Exclusive and Inclusive
-        #
-        # We iterate through all samples which corresponds to number of
-        # dimensions:
-        for dim in range(len(sample)):
-            # Single constraints.
+        # Sum constraints
+        for constraint in self.sum:
+            total = sum(np.asarray(columns[dim], dtype=float)
+                        for dim in constraint.dimensions)
+            if constraint.less_than:
+                mask &= total <= constraint.value
+            else:
+                mask &= total >= constraint.value
+        return mask
+
+    def _validate_conditional(self, columns, mask):
+        """Updates mask with the Conditional constraints"""
+        # Conditional constraints are checked one sample at a time, but only
+        # for the samples that are still valid.
+        if self.conditional:
+            for i in np.flatnonzero(mask):
+                sample = [column[i] for column in columns]
+                for constraint in self.conditional:
+                    if not constraint.validate_sample(sample):
+                        mask[i] = False
+                        break
+        return mask
+
+    def _validate_dimensions(self, columns):
+        """Returns a mask of the samples that satisfy the Single, Inclusive and
+        Exclusive constraints"""
+        n_samples = len(columns[0])
+        mask = np.ones(n_samples, dtype=bool)
+        for dim in self._active_dims:
+            column = np.asarray(columns[dim])
+            # Single constraints
+            if self._single_val[dim] is not None:
+                mask &= np.equal(column, self._single_val[dim])
+            # Inclusive constraints. The value must be inside at least one of
+            # the bounds.
+            if self._incl_lo[dim] is not None:
+                mask &= np.any(
+                    (column >= self._incl_lo[dim])
+                    & (column <= self._incl_hi[dim]), axis=0)
+            elif self._incl_cats[dim] is not None:
+                mask &= np.isin(column, self._incl_cats[dim])
+            # Exclusive constraints. The value must be outside all bounds.
+            # We find the last interval starting at or below each value and
+            # check if the value is also below its end.
+            if self._excl_lo[dim] is not None:
+                lows = self._excl_lo[dim][:, 0]
+                highs = self._excl_hi[dim][:, 0]
+                idx = np.searchsorted(lows, column, side='right') - 1
+                mask &= ~((idx >= 0) & (column <= highs[np.maximum(idx, 0)]))
+            elif self._excl_cats[dim] is not None:
+                mask &= ~np.isin(column, self._excl_cats[dim])
+        return mask
+
+    def _compile_validator(self):
+        """Packs the Single, Inclusive and Exclusive constraints into arrays
+        for the compiled validation function"""
+        global _validate_batch_jit
+        if _validate_batch_jit is None:
+            _validate_batch_jit = njit(cache=True, parallel=True)(
+                _validate_batch)
+        n_dims = len(self._active_dims)
+        single_mask = np.zeros(n_dims, dtype=np.int32)
+        single_val = np.zeros(n_dims, dtype=float)
+        n_incl = np.zeros(n_dims, dtype=np.int32)
+        n_excl = np.zeros(n_dims, dtype=np.int32)
+        # Inclusive and exclusive constraints are given as intervals.
+        # Categorical codes are intervals that only contain the code.
+        incl = [_intervals(self._incl_lo[dim], self._incl_hi[dim],
+                           self._incl_cats[dim])
+                for dim in self._active_dims]
+        excl = [_intervals(self._excl_lo[dim], self._excl_hi[dim],
+                           self._excl_cats[dim])
+                for dim in self._active_dims]
+        max_incl = max([len(intervals) for intervals in incl] + [1])
+        max_excl = max([len(intervals) for intervals in excl] + [1])
+        incl_bounds = np.zeros((n_dims, max_incl, 2), dtype=float)
+        excl_bounds = np.zeros((n_dims, max_excl, 2), dtype=float)
+        # The arrays only hold the active dimensions, in the same order as
+        # the columns passed to _validate_batch_jit.
+        for i, dim in enumerate(self._active_dims):
             if self.single[dim]:
-                if not self.single[dim].validate_constraint(sample[dim]):
-                    return False
-
-            # Inclusive constraints.
-            # Check if there is a least one inclusive constraint:
+                single_mask[i] = 1
+                single_val[i] = self._single_val[dim]
+            n_incl[i] = len(incl[i])
+            incl_bounds[i, :len(incl[i])] = incl[i]
+            n_excl[i] = len(excl[i])
+            excl_bounds[i, :len(excl[i])] = excl[i]
+        self._numba_arrays = (
+            single_mask, single_val, n_incl, incl_bounds, n_excl, excl_bounds)
+
+    def _compile_validate_sample(self):
+        """Generates a specialized version of `validate_sample` where all
+        constraints are written out as a single boolean expression.
+
+        The values and bounds of the constraints are bound as names in the
+        namespace of the generated function, so e.g. non-finite floats need
+        no literal. Dimensions with several merged Exclusive intervals are
+        binary searched, categorical bounds are looked up in frozensets, and
+        Conditional constraints call their own `validate_sample`.
+        """
+        namespace = {}
+        conditions = []
+
+        def bind(obj):
+            # Adds obj to the namespace and returns its name
+            name = '_c{}'.format(len(namespace))
+            namespace[name] = obj
+            return name
+
+        for dim in self._active_dims:
+            value = 's[{}]'.format(dim)
+            categorical = isinstance(self.space.dimensions[dim], Categorical)
+            if self.single[dim]:
+                conditions.append('{} == {}'.format(
+                    value, bind(self.single[dim].value)))
             if self.inclusive[dim]:
-                # We go through all inlcusive constraints for this dimension
-                # and if the value is not found to be included in any of the
-                # bounds of the inclusive constraints we return false.
-                value_is_valid = False
-                for constraint in self.inclusive[dim]:
-                    if constraint.validate_constraint(sample[dim]):
-                        value_is_valid = True
-                        break
-                if not value_is_valid:
-                    return False
-
-            # Exclusive constraints
-            for constraint in self.exclusive[dim]:
-                # The first time a value is inside of the excluded bounds of
-                # the exclusive constraint we return false.
-                if not constraint.validate_constraint(sample[dim]):
-                    return False
-
-        # We iterate through sum constriants
+                if categorical:
+                    conditions.append('{} in {}'.format(value, bind(
+                        frozenset().union(
+                            *[constraint._bounds_set
+                              for constraint in self.inclusive[dim]]))))
+                else:
+                    conditions.append('({})'.format(' or '.join(
+                        '{v} >= {lo} and {v} <= {hi}'.format(
+                            v=value, lo=bind(constraint.bounds[0]),
+                            hi=bind(constraint.bounds[1]))
+                        for constraint in self.inclusive[dim])))
+            if self.exclusive[dim]:
+                if categorical:
+                    conditions.append('{} not in {}'.format(value, bind(
+                        frozenset().union(
+                            *[constraint._bounds_set
+                              for constraint in self.exclusive[dim]]))))
+                elif len(self._excl_intervals[dim]) > 1:
+                    # Binary search the merged intervals
+                    lows, highs = zip(*self._excl_intervals[dim])
+                    conditions.append('{}({}, {}, {})'.format(
+                        bind(_outside_intervals), value, bind(lows),
+                        bind(highs)))
+                else:
+                    conditions.extend(
+                        'not ({v} >= {lo} and {v} <= {hi})'.format(
+                            v=value, lo=bind(lo), hi=bind(hi))
+                        for lo, hi in self._excl_intervals[dim])
         for constraint in self.sum:
-            if not constraint.validate_sample(sample):
-                return False
-        # We iterate through Conditional constraints
+            conditions.append('{} {} {}'.format(
+                ' + '.join('s[{}]'.format(dim) for dim in constraint.dimensions),
+                '<=' if constraint.less_than else '>=',
+                bind(constraint.value)))
         for constraint in self.conditional:
-            if not constraint.validate_sample(sample):
-                return False
-        # If we we did not find any violaiton of the constraints we return
-        # True.
-        return True
+            conditions.append('{}(s)'.format(bind(constraint.validate_sample)))
+
+        if not conditions:
+            # Without constraints all samples are valid
+            conditions.append('True')
+        body = ' and\n            '.join(
+            '({})'.format(condition) for condition in conditions)
+        source = 'def validate_sample(s):\n    return bool({})\n'.format(body)
+        exec(compile(source, '<constraints>', 'exec'), namespace)
+        validate_sample = namespace['validate_sample']
+        validate_sample.__doc__ = _VALIDATE_SAMPLE_DOC
+        self.validate_sample = validate_sample
+
+    def __getstate__(self):
+        # The generated validate_sample can not be pickled, so it is created
+        # again when unpickling. The arrays for the numba kernel are dropped as
+        # well, since the kernel itself is compiled per process and the
+        # arrays are what triggers the compilation in `_validate_coded`.
+        state = self.__dict__.copy()
+        del state['validate_sample']
+        state['_numba_arrays'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile_validate_sample()
 
     def __repr__(self):
         return "Constraints({})".format(self.constraints_list)
 
 
+# The docstring of the validate_sample generated by Constraints
+_VALIDATE_SAMPLE_DOC = """Validates a sample of parameter values in regards
+to the constraints.
+
+Parameters
+----------
+* `sample` [list]:
+    A list of values for each dimension.
+
+Returns
+-------
+* `is_valid`: [bool]
+   Returns True for valid samples and False for non-valid samples
+"""
+
+
 class Single:
+    KIND = SINGLE
+
     def __init__(self, dimension, value, dimension_type):
         """Constraint class of type Single.
 
@@ -254,6 +713,9 @@ class Single:
         else:
             return False
 
+    def __hash__(self):
+        return hash((self.KIND, self.dimension, self.dimension_type, self.value))
+
 
 class Bound_constraint():
     def __init__(self, dimension, bounds, dimension_type):
@@ -282,11 +744,16 @@ class Bound_constraint():
             raise ValueError('Dimension can not be a negative number')
 
         self.bounds = tuple(bounds)  # Convert bounds to a tuple
+        if dimension_type == 'categorical':
+            # Set for fast lookup of categorical values
+            self._bounds_set = frozenset(self.bounds)
         self.dimension = dimension
         self.dimension_type = dimension_type
 
 
 class Inclusive(Bound_constraint):
+    KIND = INCLUSIVE
+
     def __init__(self, dimension, bounds, dimension_type):
         super().__init__(dimension, bounds, dimension_type)
         """Constraint class of type Inclusive.
@@ -332,10 +799,7 @@ class Inclusive(Bound_constraint):
         return self.validate_constraint(sample[self.dimension])
 
     def _validate_constraint_categorical(self, value):
-        if value in self.bounds:
-            return True
-        else:
-            return False
+        return value in self._bounds_set
 
     def _validate_constraint_real(self, value):
         if value >= self.bounds[0] and value <= self.bounds[1]:
@@ -348,12 +812,17 @@ class Inclusive(Bound_constraint):
 
     def __eq__(self, other):
         if isinstance(other, Inclusive):
-            return all([a == b for a, b in zip(self.bounds, other.bounds)]) and self.dimension == other.dimension and self.dimension_type == other.dimension_type
+            return self.bounds == other.bounds and self.dimension == other.dimension and self.dimension_type == other.dimension_type
         else:
             return False
 
+    def __hash__(self):
+        return hash((self.KIND, self.dimension, self.dimension_type, self.bounds))
+
 
 class Exclusive(Bound_constraint):
+    KIND = EXCLUSIVE
+
     def __init__(self, dimension, bounds, dimension_type):
         super().__init__(dimension, bounds, dimension_type)
         """Constraint class of type Inclusive.
@@ -398,10 +867,7 @@ class Exclusive(Bound_constraint):
         return self.validate_constraint(sample[self.dimension])
 
     def _validate_constraint_categorical(self, value):
-        if value in self.bounds:
-            return False
-        else:
-            return True
+        return value not in self._bounds_set
 
     def _validate_constraint_real(self, value):
         if value >= self.bounds[0] and value <= self.bounds[1]:
@@ -414,12 +880,17 @@ class Exclusive(Bound_constraint):
 
     def __eq__(self, other):
         if isinstance(other, Exclusive):
-            return all([a == b for a, b in zip(self.bounds, other.bounds)]) and self.dimension == other.dimension and self.dimension_type == other.dimension_type
+            return self.bounds == other.bounds and self.dimension == other.dimension and self.dimension_type == other.dimension_type
         else:
             return False
 
+    def __hash__(self):
+        return hash((self.KIND, self.dimension, self.dimension_type, self.bounds))
+
 
 class Sum():
+    KIND = SUM
+
     def __init__(self, dimensions, value, less_than=True):
         """Constraint class of type Sum.
 
@@ -472,12 +943,17 @@ class Sum():
 
     def __eq__(self, other):
         if isinstance(other, Sum):
-            return all([a == b for a, b in zip(self.dimensions, other.dimensions)]) and self.value == other.value and self.less_than == other.less_than
+            return self.dimensions == other.dimensions and self.value == other.value and self.less_than == other.less_than
         else:
             return False
 
+    def __hash__(self):
+        return hash((self.KIND, self.dimensions, self.value, self.less_than))
+
 
 class Conditional():
+    KIND = CONDITIONAL
+
     def __init__(self, condition, if_true=None, if_false=None):
         ''' Constraint class of type Conditional
 
@@ -564,6 +1040,15 @@ class Conditional():
         else:
             return False
 
+    def __hash__(self):
+        return hash((self.KIND, self.condition, self.if_true, self.if_false))
+
+
+# The dimension_type of constraints for each type of dimension
+_DIM_TYPE = {Real: 'real', Integer: 'integer', Categorical: 'categorical'}
+
+_CONSTRAINT_CLASSES = (Single, Inclusive, Exclusive, Sum, Conditional)
+
 
 def check_constraints(space, constraints):
     """ Checks if list of constraints is valid when compared with the
@@ -583,29 +1068,45 @@ def check_constraints(space, constraints):
     n_dims = space.n_dims
 
     single_constraints = [False] * n_dims
+    # Values of Single constraints and bounds of Inclusive and Exclusive
+    # constraints on numerical dimensions are checked against the bounds of
+    # the space all at once after the loop.
+    numerical_dims, numerical_values, numerical_constraints = [], [], []
     for constraint in constraints:
+        kind = getattr(constraint, 'KIND', None)
 
         # Check if constraints are inside bounds of space and if more than one
         # single constraint has been applied to the same dimension
-        if isinstance(constraint, Single):
+        if kind == SINGLE:
             check_dim_and_space(space, constraint)
             ind_dim = constraint.dimension
             if single_constraints[ind_dim] is True:
                 raise IndexError('Can not add more than one Singe-type constraint to dimension {}'.format(ind_dim))
             single_constraints[ind_dim] = True
-            space_dim = space.dimensions[constraint.dimension]
-            check_value(space_dim, constraint.value)
-        elif isinstance(constraint, Inclusive) or isinstance(constraint, Exclusive):
+            if constraint.dimension_type == 'categorical':
+                space_dim = space.dimensions[constraint.dimension]
+                check_value(space_dim, constraint.value)
+            else:
+                numerical_dims.append(ind_dim)
+                numerical_values.append(constraint.value)
+                numerical_constraints.append(constraint)
+        elif kind == INCLUSIVE or kind == EXCLUSIVE:
             check_dim_and_space(space, constraint)
-            space_dim = space.dimensions[constraint.dimension]
-            check_bounds(space_dim, constraint.bounds)
-        elif isinstance(constraint, Sum):
+            if constraint.dimension_type == 'categorical':
+                space_dim = space.dimensions[constraint.dimension]
+                check_bounds(space_dim, constraint.bounds)
+            else:
+                for bound in constraint.bounds:
+                    numerical_dims.append(constraint.dimension)
+                    numerical_values.append(bound)
+                    numerical_constraints.append(constraint)
+        elif kind == SUM:
             if not all(dim < n_dims for dim in constraint.dimensions):
                 raise IndexError('Dimension index exceeds number of dimensions')
             for ind_dim in constraint.dimensions:
                 if isinstance(space.dimensions[ind_dim], Categorical):
                     raise ValueError('Sum constraint can not be applid to categorical dimension: {}'.format(space.dimensions[ind_dim]))
-        elif isinstance(constraint, Conditional):
+        elif kind == CONDITIONAL:
             # We run check_constraints on each constraint instance in the
             # conditional constraint. We only check them if they are not None
             if constraint.condition:
@@ -620,6 +1121,24 @@ def check_constraints(space, constraints):
         else:
             raise TypeError('Constraints must be of type "Single", "Exlusive", "Inclusive", "Sum" or "Conditional". Got {}'.format(type(constraint)))
 
+    if numerical_values:
+        lows = np.array([getattr(dim, 'low', np.nan)
+                         for dim in space.dimensions], dtype=float)
+        highs = np.array([getattr(dim, 'high', np.nan)
+                          for dim in space.dimensions], dtype=float)
+        dims = np.array(numerical_dims)
+        values = np.array(numerical_values, dtype=float)
+        violations = (values < lows[dims]) | (values > highs[dims])
+        if violations.any():
+            # Raise an error for the first constraint outside the space
+            i = np.argmax(violations)
+            constraint = numerical_constraints[i]
+            space_dim = space.dimensions[constraint.dimension]
+            if constraint.KIND == SINGLE:
+                raise ValueError('Value {} exceeds bounds of space {}'.format(constraint.value, [space_dim.low, space_dim.high]))
+            else:
+                raise ValueError('Bounds {} exceeds bounds of space {}'.format(constraint.bounds, [space_dim.low, space_dim.high]))
+
 
 def check_dim_and_space(space, constraint):
     n_dims = space.n_dims
@@ -629,17 +1148,23 @@ def check_dim_and_space(space, constraint):
     space_dim = space.dimensions[constraint.dimension]
 
     # Check if space dimensions types are the same as constraint dimension types
-    if isinstance(space_dim, Real):
-        if not constraint.dimension_type == 'real':
-            raise TypeError('Constraint for real dimension {} must be of dimension_type real. Got {}'.format(ind_dim, constraint.dimension_type))
-    elif isinstance(space_dim, Integer):
-        if not constraint.dimension_type == 'integer':
-            raise TypeError('Constraint for integer dimension {} must be of dimension_type integer. Got {}'.format(ind_dim, constraint.dimension_type))
-    elif isinstance(space_dim, Categorical):
-        if not constraint.dimension_type == 'categorical':
-            raise TypeError('Constraint for categorical dimension {} must be of dimension_type categorical. Got {}'.format(ind_dim, constraint.dimension_type))
-    else:
+    expected = _dimension_type(space_dim)
+    if expected is None:
         raise TypeError('Can not find valid dimension for' + str(space_dim))
+    if not constraint.dimension_type == expected:
+        raise TypeError('Constraint for {} dimension {} must be of dimension_type {}. Got {}'.format(expected, ind_dim, expected, constraint.dimension_type))
+
+
+def _dimension_type(dim):
+    """Returns the dimension_type constraints must have for dimension dim,
+    or None if it is not a Real, Integer or Categorical dimension"""
+    expected = _DIM_TYPE.get(type(dim))
+    if expected is None:
+        # Subclasses of the dimension classes are not in the dict
+        for dim_class, dim_type in _DIM_TYPE.items():
+            if isinstance(dim, dim_class):
+                return dim_type
+    return expected
 
 
 def check_bounds(dim, bounds):
@@ -656,7 +1181,7 @@ def check_bounds(dim, bounds):
         """
 
     # Real or integer dimensions.
-    if isinstance(dim, Real) or isinstance(dim, Integer):
+    if isinstance(dim, (Real, Integer)):
         for value in bounds:
             if value < dim.low or value > dim.high:
                 raise ValueError('Bounds {} exceeds bounds of space {}'.format(bounds, [dim.low, dim.high]))
@@ -680,7 +1205,7 @@ def check_value(dim, value):
         """
 
     # Real or integer dimension
-    if isinstance(dim, Real) or isinstance(dim, Integer):
+    if isinstance(dim, (Real, Integer)):
         if value < dim.low or value > dim.high:
             raise ValueError('Value {} exceeds bounds of space {}'.format(value, [dim.low, dim.high]))
     else:  # Categorical dimension.
@@ -692,7 +1217,122 @@ def check_is_constraint(constraint):
     ''' Checks if constraint is a valid constraint type. Throws error otherwise.
     Types can be Single, Inclusive, Exclusive, Sum and Conditional'''
 
-    if not (isinstance(constraint, Single) or isinstance(constraint, Inclusive)
-            or isinstance(constraint, Exclusive) or isinstance(constraint, Sum)
-            or isinstance(constraint, Conditional)):
+    if not isinstance(constraint, _CONSTRAINT_CLASSES):
         raise TypeError('Constraint must be of type Inclusive, Exlusive, Single, Sum or Conditional. Got {}'.format(type(constraint)))
+
+
+def _validate_batch(samples, single_mask, single_val, n_incl, incl_bounds,
+                    n_excl, excl_bounds):
+    """Validates samples in regards to Single, Inclusive and Exclusive
+    constraints. Compiled with Numba when it is installed.
+
+    Parameters
+    ----------
+    * `samples` [array of floats, shape=(n_samples, n_dims)]:
+        The samples to validate. Categorical values are given as codes.
+
+    * `single_mask` [array of int32, shape=(n_dims,)]:
+        1 for dimensions with a Single constraint, otherwise 0.
+
+    * `single_val` [array of floats, shape=(n_dims,)]:
+        The value of the Single constraint of each dimension.
+
+    * `n_incl`, `n_excl` [arrays of int32, shape=(n_dims,)]:
+        The number of Inclusive and Exclusive constraints for each dimension.
+
+    * `incl_bounds`, `excl_bounds` [arrays of floats, shape=(n_dims, k, 2)]:
+        The bounds of the Inclusive and Exclusive constraints for each
+        dimension. Only the first `n_incl[dim]` and `n_excl[dim]` are used.
+
+    Returns
+    -------
+    * `is_valid`: [array of bools, shape=(n_samples,)]
+       True for valid samples and False for non-valid samples
+    """
+    n_samples, n_dims = samples.shape
+    mask = np.ones(n_samples, dtype=np.bool_)
+    for i in prange(n_samples):
+        for dim in range(n_dims):
+            value = samples[i, dim]
+            if single_mask[dim] == 1 and value != single_val[dim]:
+                mask[i] = False
+                break
+            if n_incl[dim] > 0:
+                included = False
+                for k in range(n_incl[dim]):
+                    if (value >= incl_bounds[dim, k, 0]
+                            and value <= incl_bounds[dim, k, 1]):
+                        included = True
+                        break
+                if not included:
+                    mask[i] = False
+                    break
+            excluded = False
+            for k in range(n_excl[dim]):
+                if (value >= excl_bounds[dim, k, 0]
+                        and value <= excl_bounds[dim, k, 1]):
+                    excluded = True
+                    break
+            if excluded:
+                mask[i] = False
+                break
+    return mask
+
+
+# The compiled version of _validate_batch. Created the first time it is used.
+_validate_batch_jit = None
+
+
+def _is_uniform_integer(dim):
+    """Returns True if the Integer dimension samples uniformly between its
+    bounds, i.e. it has the identity transform and its sampling distribution
+    has not been replaced with `Integer.update_samplingspace`.
+
+    The distribution is checked when the Constraints are created, so it
+    should be updated before that."""
+    rvs = dim._rvs
+    return (dim.transform_ == 'identity'
+            and getattr(getattr(rvs, 'dist', None), 'name', None) == 'randint'
+            and tuple(rvs.args) == (dim.low, dim.high + 1)
+            and not rvs.kwds)
+
+
+def _merge_intervals(bounds):
+    """Sorts a list of (low, high) bounds and merges the overlapping ones.
+
+    Returns a list of (low, high) tuples sorted by low."""
+    merged = []
+    for low, high in sorted(bounds):
+        if merged and low <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def _outside_intervals(value, lows, highs):
+    """Returns True if `value` is outside all the sorted, non-overlapping
+    intervals given by `lows` and `highs`"""
+    # Only the last interval starting at or below the value can contain it
+    idx = bisect_right(lows, value) - 1
+    return idx < 0 or value > highs[idx]
+
+
+def _intervals(lows, highs, codes):
+    """Returns the bounds of numerical constraints, or the codes of
+    categorical constraints, as an array of intervals of shape (k, 2)"""
+    if lows is not None:
+        return np.column_stack([lows[:, 0], highs[:, 0]])
+    elif codes is not None:
+        return np.column_stack([codes, codes])
+    else:
+        return np.zeros((0, 2))
+
+
+def _object_array(values):
+    """Returns the values as a 1D object array without converting them to a
+    common type, so e.g. mixed str and int categories are kept as they are"""
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
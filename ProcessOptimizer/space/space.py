@@ -7,7 +7,6 @@ from scipy.stats.distributions import rv_discrete
 from scipy.stats.distributions import uniform
 
 from sklearn.utils import check_random_state
-from sklearn.utils.fixes import sp_version
 
 from .transformers import CategoricalEncoder
 from .transformers import Normalize
@@ -693,13 +692,7 @@ class Space(object):
             columns.append(dim.rvs(n_samples=n_samples, random_state=rng))
 
         # Transpose
-        rows = []
-        for i in range(n_samples):
-            r = []
-            for j in range(self.n_dims):
-                r.append(columns[j][i])
-
-            rows.append(r)
+        rows = [[column[i] for column in columns] for i in range(n_samples)]
 
         return rows
 
@@ -768,14 +761,7 @@ class Space(object):
             start += offset
 
         # Transpose
-        rows = []
-
-        for i in range(len(Xt)):
-            r = []
-            for j in range(self.n_dims):
-                r.append(columns[j][i])
-
-            rows.append(r)
+        rows = [[column[i] for column in columns] for i in range(len(Xt))]
 
         return rows
 
@@ -1,7 +1,10 @@
+import pickle
+
 import numpy as np
 import pytest
 from pytest import raises
 
+from ProcessOptimizer.space import constraints as constraints_module
 from ProcessOptimizer.space.constraints import (
     Constraints,
     Single,
@@ -61,6 +64,34 @@ def test_constraints_equality():
     cons_b = Constraints(cons_list_b, space_b)
     assert cons_a != cons_b
 
+    # Equal constraints should have equal hashes
+    space = Space([(0.0, 5.0), (0, 5), ["a", "b", "c"]])
+    cons_list_a = [
+        Single(0, 4.0, "real"),
+        Inclusive(1, (1, 3), "integer"),
+        Exclusive(2, ("a", "b"), "categorical"),
+        Sum((0, 1), 5.0),
+        Conditional(Single(2, "a", "categorical"), Single(1, 2, "integer")),
+    ]
+    cons_list_b = [
+        Single(0, 4.0, "real"),
+        Inclusive(1, (1, 3), "integer"),
+        Exclusive(2, ("a", "b"), "categorical"),
+        Sum((0, 1), 5.0),
+        Conditional(Single(2, "a", "categorical"), Single(1, 2, "integer")),
+    ]
+    for a, b in zip(cons_list_a, cons_list_b):
+        assert_equal(a, b)
+        assert_equal(hash(a), hash(b))
+    cons_a = Constraints(cons_list_a, space)
+    cons_b = Constraints(cons_list_b, space)
+    assert_equal(cons_a, cons_b)
+    assert_equal(hash(cons_a), hash(cons_b))
+
+    # Categorical bounds of different lengths should not be equal
+    assert Exclusive(2, ("a", "b"), "categorical") != Exclusive(
+        2, ("a", "b", "c"), "categorical")
+
 
 @pytest.mark.fast_test
 def test_single_inclusive_and_exclusive():
@@ -173,6 +204,14 @@ def test_Sum():
     for sample in samples:
         assert cons.validate_sample(sample)
 
+    # Non-finite values should be handled like finite ones
+    cons = Constraints([Sum((0, 1), float("inf"))], space)
+    assert cons.validate_sample([1.0, 2, "a"])
+    assert_equal(cons.validate_samples([np.array([1.0]), np.array([2]),
+                                        np.array(["a"])]), [True])
+    cons = Constraints([Sum((0, 1), float("inf"), less_than=False)], space)
+    assert not cons.validate_sample([1.0, 2, "a"])
+
 
 @pytest.mark.fast_test
 def test_Conditional():
@@ -303,6 +342,19 @@ def test_check_constraints():
     with raises(IndexError):
         check_constraints(space, cons_list)
 
+    # Values and bounds must be inside the space
+    cons_list = [Single(0, 1.0, "real"), Single(1, 6, "integer")]
+    with raises(ValueError, match="Value 6 exceeds"):
+        check_constraints(space, cons_list)
+    cons_list = [Inclusive(0, (1.0, 2.0), "real"), Exclusive(1, (-1, 2), "integer")]
+    with raises(ValueError, match="Bounds"):
+        check_constraints(space, cons_list)
+    cons_list = [Exclusive(2, ("a", "d"), "categorical")]
+    with raises(ValueError):
+        check_constraints(space, cons_list)
+    cons_list = [Single(0, 5.0, "real"), Inclusive(1, (0, 5), "integer")]
+    check_constraints(space, cons_list)
+
 
 @pytest.mark.fast_test
 def test_check_bounds():
@@ -434,6 +486,14 @@ def test_Constraints_init():
     assert not cons.exclusive[5] == []
     assert_equal(len(cons.exclusive[5]), 2)
 
+    # Test that all dimensions with constraints are active
+    assert_equal(cons._active_dims, list(range(space.n_dims)))
+    cons = Constraints([Single(1, 5.0, "real"), Sum((0, 2), 5.0)], space)
+    assert_equal(cons._active_dims, [1])
+    cons = Constraints([], space)
+    assert_equal(cons._active_dims, [])
+    assert cons.validate_sample([0] * space.n_dims)
+
 
 @pytest.mark.fast_test
 def test_Constraints_validate_sample():
@@ -640,6 +700,149 @@ def test_Constraints_validate_sample():
     assert cons.validate_sample(sample)
 
 
+@pytest.mark.fast_test
+def test_Constraints_merged_exclusive(monkeypatch):
+    # Validate all batches with numba when it is installed
+    monkeypatch.setattr(constraints_module, "_NUMBA_MIN_SAMPLES", 0)
+    space = Space([Real(0, 10), Integer(0, 10)])
+    cons_list = [
+        Exclusive(0, (5.0, 6.0), "real"),
+        Exclusive(0, (1.0, 2.0), "real"),
+        Exclusive(0, (1.5, 3.0), "real"),
+        Exclusive(0, (3.0, 4.0), "real"),
+        Exclusive(1, (1, 2), "integer"),
+        Exclusive(1, (4, 6), "integer"),
+        Exclusive(1, (5, 5), "integer"),
+    ]
+    cons = Constraints(cons_list, space)
+    # Overlapping intervals should be merged and sorted
+    assert_equal(cons._excl_intervals[0], [(1.0, 4.0), (5.0, 6.0)])
+    assert_equal(cons._excl_intervals[1], [(1, 2), (4, 6)])
+    assert_equal(len(cons.exclusive[0]), 4)
+
+    values = [0.5, 1.0, 2.5, 4.0, 4.5, 5.0, 6.0, 6.5, 10.0]
+    valid = [True, False, False, False, True, False, False, True, True]
+    for value, is_valid in zip(values, valid):
+        assert_equal(cons.validate_sample([value, 0]), is_valid)
+    columns = [np.array(values), np.zeros(len(values))]
+    assert_equal(cons.validate_samples(columns), valid)
+    values = [0, 1, 2, 3, 4, 5, 6, 7]
+    valid = [True, False, False, True, False, False, False, True]
+    for value, is_valid in zip(values, valid):
+        assert_equal(cons.validate_sample([0.0, value]), is_valid)
+    columns = [np.zeros(len(values)), np.array(values)]
+    assert_equal(cons.validate_samples(columns), valid)
+    # Both with and without numba
+    cons._use_numba = False
+    assert_equal(cons.validate_samples(columns), valid)
+
+
+@pytest.mark.fast_test
+def test_Constraints_validate_samples(monkeypatch):
+    # Validate all batches with numba when it is installed
+    monkeypatch.setattr(constraints_module, "_NUMBA_MIN_SAMPLES", 0)
+    space = Space(
+        [
+            Real(1, 10),
+            Real(1, 10),
+            Real(1, 10),
+            Integer(0, 10),
+            Integer(0, 10),
+            Integer(0, 10),
+            Categorical(list("abcdefg")),
+            Categorical(list("abcdefg")),
+            Categorical(list("abcdefg")),
+        ]
+    )
+
+    cons_list = [
+        Inclusive(1, (3.0, 5.0), "real"),
+        Inclusive(1, (6.0, 8.0), "real"),
+        Exclusive(2, (3.0, 5.0), "real"),
+        Single(3, 5, "integer"),
+        Inclusive(4, (3, 5), "integer"),
+        Exclusive(5, (3, 5), "integer"),
+        Exclusive(5, (7, 9), "integer"),
+        Single(6, "b", "categorical"),
+        Inclusive(7, ("c", "d", "e"), "categorical"),
+        Exclusive(8, ("c", "d", "e"), "categorical"),
+        Sum((0, 4), 9.0),
+        Conditional(
+            Inclusive(7, ("c", "d"), "categorical"),
+            if_true=Exclusive(0, (2.0, 4.0), "real"),
+        ),
+    ]
+    cons = Constraints(cons_list, space)
+
+    # The vectorized validation should agree with validating one sample at
+    # a time
+    samples = space.rvs(n_samples=1000, random_state=1)
+    samples[:100] = cons.rvs(n_samples=100, random_state=1)
+    columns = [
+        np.array([sample[dim] for sample in samples], dtype=object)
+        if isinstance(space.dimensions[dim], Categorical)
+        else np.array([sample[dim] for sample in samples])
+        for dim in range(space.n_dims)
+    ]
+    mask = cons.validate_samples(columns)
+    assert_equal(mask.shape, (1000,))
+    assert_equal(mask, [cons.validate_sample(sample) for sample in samples])
+    assert all(mask[:100])
+
+    # Also without the compiled validation
+    cons._use_numba = False
+    assert_equal(cons.validate_samples(columns), mask)
+
+
+@pytest.mark.fast_test
+def test_Constraints_pickle():
+    space = Space([Real(1, 10), Integer(0, 10), Categorical(list("abc"))])
+    cons_list = [
+        Inclusive(0, (3.0, 5.0), "real"),
+        Single(1, 5, "integer"),
+        Exclusive(2, ("a", "b"), "categorical"),
+    ]
+    cons = Constraints(cons_list, space)
+    # The generated validate_sample should be recreated when unpickling
+    cons_b = pickle.loads(pickle.dumps(cons))
+    assert_equal(cons, cons_b)
+    assert cons_b.validate_sample([4.0, 5, "c"])
+    assert not cons_b.validate_sample([4.0, 5, "a"])
+    assert not cons_b.validate_sample([6.0, 5, "c"])
+
+
+@pytest.mark.fast_test
+def test_Constraints_validate_samples_numba(monkeypatch):
+    pytest.importorskip("numba")
+    space = Space([Real(1, 10), Real(1, 10), Integer(0, 10), Integer(0, 10)])
+    cons_list = [
+        Single(0, 5.0, "real"),
+        Inclusive(1, (3.0, 5.0), "real"),
+        Inclusive(1, (6.0, 8.0), "real"),
+        Exclusive(1, (4.0, 4.5), "real"),
+        Single(2, 5, "integer"),
+        Exclusive(3, (3, 5), "integer"),
+        Exclusive(3, (7, 9), "integer"),
+    ]
+    cons = Constraints(cons_list, space)
+    assert cons._use_numba
+
+    # Small batches are validated with numpy without compiling
+    columns = [np.array([5.0]), np.array([3.5]), np.array([5]), np.array([1])]
+    assert_equal(cons.validate_samples(columns), [True])
+    assert cons._numba_arrays is None
+
+    # The compiled validation should agree with the numpy validation
+    monkeypatch.setattr(constraints_module, "_NUMBA_MIN_SAMPLES", 0)
+    samples = space.rvs(n_samples=1000, random_state=1)
+    samples[:100] = cons.rvs(n_samples=100, random_state=1)
+    samples = np.array(samples)
+    columns = [samples[:, dim] for dim in range(space.n_dims)]
+    mask = cons.validate_samples(columns)
+    assert_equal(mask, cons._validate_dimensions(columns))
+    assert all(mask[:100])
+
+
 @pytest.mark.slow_test
 def test_constraints_rvs():
     space = Space(
@@ -696,6 +899,154 @@ def test_constraints_rvs():
         samples = constraints.rvs(n_samples=10)
 
 
+@pytest.mark.fast_test
+def test_constraints_rvs_equal_categories():
+    # 1 and True are equal, so constraints on one of them apply to both
+    space = Space([Categorical([1, True, "x"]), Real(0.0, 1.0)])
+    constraints = Constraints(
+        [Exclusive(0, (True, "x"), "categorical")], space)
+    assert not constraints.validate_sample([1, 0.5])
+    with raises(RuntimeError):
+        constraints.rvs(n_samples=10, random_state=1)
+
+    constraints = Constraints([Exclusive(0, ("x", "x"), "categorical")], space)
+    samples = constraints.rvs(n_samples=100, random_state=1)
+    assert_equal({repr(sample[0]) for sample in samples}, {"1", "True"})
+
+    # A Single constraint returns the category with the type of its value
+    constraints = Constraints([Single(0, 1, "categorical")], space)
+    samples = constraints.rvs(n_samples=10, random_state=1)
+    assert_equal({repr(sample[0]) for sample in samples}, {"1"})
+    assert constraints.validate_sample([True, 0.5])
+
+
+@pytest.mark.fast_test
+def test_constraints_rvs_acceptance_rate():
+    space = Space([Real(0.0, 1.0), Real(0.0, 1.0)])
+    # Only around 1 in 1000 candidates are valid
+    constraints = Constraints([Inclusive(0, (0.5, 0.501), "real")], space)
+    samples = constraints.rvs(n_samples=100, random_state=1)
+    assert_equal(len(samples), 100)
+    for sample in samples:
+        assert constraints.validate_sample(sample)
+
+    # No candidates are valid. The error should be raised after a bounded
+    # number of batches.
+    cons_list = [
+        Exclusive(0, (0.3, 0.7), "real"),
+        Inclusive(0, (0.5, 0.6), "real"),
+    ]
+    constraints = Constraints(cons_list, space)
+    batches = []
+    sample_columns = constraints._sample_columns
+
+    def counting_sample_columns(n_samples, rng):
+        batches.append(n_samples)
+        return sample_columns(n_samples, rng)
+
+    constraints._sample_columns = counting_sample_columns
+    with raises(RuntimeError):
+        constraints.rvs(n_samples=10, random_state=1)
+    assert len(batches) <= 15
+    assert sum(batches) <= 200000
+
+    # Single samples, as asked for by the Optimizer, should only draw a few
+    # candidates when around 40 % of them are valid
+    constraints = Constraints([Exclusive(0, (0.0, 0.6), "real")], space)
+    sample_columns = constraints._sample_columns
+    constraints._sample_columns = counting_sample_columns
+    batches.clear()
+    rng = np.random.RandomState(1)
+    for _ in range(200):
+        sample = constraints.rvs(random_state=rng)[0]
+        assert constraints.validate_sample(sample)
+    assert max(batches) <= 64
+    assert sum(batches) <= 2000
+
+
+@pytest.mark.fast_test
+def test_constraints_rvs_samplers():
+    from scipy.stats import randint
+
+    updated = Integer(0, 10)
+    updated.update_samplingspace(randint(2, 4))
+    space = Space(
+        [
+            Real(1e-3, 1e3, prior="log-uniform"),
+            Real(0.0, 1e-300),
+            Integer(0, 2),
+            Integer(0, 5, transform="normalize"),
+            Categorical(list("abc"), prior=[1.0, 0.0, 0.0]),
+            Categorical(list("abc")),
+            updated,
+        ]
+    )
+    cons_list = [Single(5, "b", "categorical")]
+    constraints = Constraints(cons_list, space)
+    samples = np.array(constraints.rvs(n_samples=2000, random_state=1),
+                       dtype=object)
+
+    # Log-uniform values are spread evenly over the decades
+    assert all(1e-3 <= value <= 1e3 for value in samples[:, 0])
+    assert 0.4 < np.mean(samples[:, 0] < 1) < 0.6
+    # Both bounds are inclusive
+    assert all(0.0 <= value <= 1e-300 for value in samples[:, 1])
+    assert_equal(set(samples[:, 2]), {0, 1, 2})
+    # Integers with the normalize transform are sampled by the dimension
+    assert_equal(set(samples[:, 3]), {0, 1, 2, 3, 4, 5})
+    # The prior of categorical dimensions is respected
+    assert_equal(set(samples[:, 4]), {"a"})
+    # Dimensions with a Single constraint only get the single value
+    assert_equal(set(samples[:, 5]), {"b"})
+    # An updated sampling space is sampled instead of the bounds
+    assert_equal(set(samples[:, 6]), {2, 3})
+
+
+@pytest.mark.slow_test
+def test_constraints_rvs_n_jobs(monkeypatch):
+    space = Space([Real(1, 10), Integer(0, 10), Categorical(list("abcdefg"))])
+    cons_list = [
+        Exclusive(0, (3.0, 5.0), "real"),
+        Inclusive(1, (3, 5), "integer"),
+        Exclusive(2, ("c", "d", "e"), "categorical"),
+    ]
+    constraints = Constraints(cons_list, space)
+
+    # Few candidates are needed, so the samples are drawn in this process
+    assert_equal(constraints.rvs(n_samples=2000, random_state=1, n_jobs=2),
+                 constraints.rvs(n_samples=2000, random_state=1))
+
+    # Always sample in parallel
+    monkeypatch.setattr(constraints_module, "_PARALLEL_MIN_CANDIDATES", 0)
+    samples_a = constraints.rvs(n_samples=2000, random_state=1, n_jobs=2)
+    samples_b = constraints.rvs(n_samples=2000, random_state=1, n_jobs=2)
+    assert_equal(len(samples_a), 2000)
+    assert_equal(samples_a, samples_b)
+    for sample in samples_a:
+        assert constraints.validate_sample(sample)
+
+
+@pytest.mark.slow_test
+def test_constraints_rvs_n_jobs_after_rvs(monkeypatch):
+    # Sampling in the parent process first prepares the validation, which
+    # must not leak into the worker processes
+    monkeypatch.setattr(constraints_module, "_PARALLEL_MIN_CANDIDATES", 0)
+    monkeypatch.setattr(constraints_module, "_NUMBA_MIN_SAMPLES", 0)
+    space = Space([Real(0.0, 1.0)])
+    constraints = Constraints([Exclusive(0, (0.1, 0.9), "real")], space)
+    constraints.rvs(n_samples=10, random_state=0)
+    samples = constraints.rvs(n_samples=2000, random_state=1, n_jobs=2)
+    assert_equal(len(samples), 2000)
+    for sample in samples:
+        assert constraints.validate_sample(sample)
+
+    # The pickled state should not carry the prepared validation either
+    constraints_b = pickle.loads(pickle.dumps(constraints))
+    assert constraints_b._numba_arrays is None
+    assert_equal(constraints_b.rvs(n_samples=10, random_state=0),
+                 constraints.rvs(n_samples=10, random_state=0))
+
+
 @pytest.mark.slow_test
 @pytest.mark.parametrize("acq_optimizer", ACQ_OPTIMIZERS)
 def test_optimizer_with_constraints(acq_optimizer):
@@ -25,7 +25,8 @@ setup(name='ProcessOptimizer',
       install_requires=['numpy', 'matplotlib', 'scipy',
                         'scikit-learn>=0.24.2', 'six', 'deap', 'pyYAML'],
       extras_require={
-          "bokeh": ['bokeh', 'tornado']
+          "bokeh": ['bokeh', 'tornado'],
+          "numba": ['numba']
           },
       long_description=long_description,
       long_description_content_type='text/markdown'